@@ -0,0 +1,38 @@
+"""Add device health summary table
+
+Revision ID: 002_device_health_summary
+Revises: 001_initial
+Create Date: 2024-12-14
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002_device_health_summary'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create the single-row device health summary table.
+    """
+    op.create_table(
+        'device_health_summary',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('healthy', sa.Integer(), nullable=False),
+        sa.Column('caution', sa.Integer(), nullable=False),
+        sa.Column('unhealthy', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """
+    Drop the device health summary table.
+    """
+    op.drop_table('device_health_summary')
@@ -0,0 +1,35 @@
+"""Index cached device health by expiry and name
+
+Revision ID: 003_cache_indexes
+Revises: 002_device_health_summary
+Create Date: 2024-12-21
+
+"""
+from alembic import op
+
+revision = '003_cache_indexes'
+down_revision = '002_device_health_summary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Add a composite index for the unexpired, name-ordered cache listing and
+    drop the redundant index on the primary key.
+    """
+    op.create_index(
+        'ix_cached_device_health_expires_at_device_name',
+        'cached_device_health',
+        ['expires_at', 'device_name'],
+        unique=False
+    )
+    op.drop_index('ix_cached_device_health_id', table_name='cached_device_health')
+
+
+def downgrade() -> None:
+    """
+    Restore the primary key index and drop the composite index.
+    """
+    op.create_index('ix_cached_device_health_id', 'cached_device_health', ['id'], unique=False)
+    op.drop_index('ix_cached_device_health_expires_at_device_name', table_name='cached_device_health')
@@ -0,0 +1,37 @@
+"""Tag cached device health with the settings version
+
+Revision ID: 004_cache_settings_version
+Revises: 003_cache_indexes
+Create Date: 2024-12-28
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004_cache_settings_version'
+down_revision = '003_cache_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Record which settings version each cached row and the summary row were
+    computed under.
+    """
+    op.add_column(
+        'cached_device_health',
+        sa.Column('settings_version', sa.Integer(), server_default='0', nullable=False)
+    )
+    op.add_column(
+        'device_health_summary',
+        sa.Column('settings_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """
+    Drop the settings version columns.
+    """
+    op.drop_column('device_health_summary', 'settings_version')
+    op.drop_column('cached_device_health', 'settings_version')
@@ -0,0 +1,19 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.health_service import HealthCheckService
+from app.core.database import get_db
+from app.services.jamf_service import get_jamf_service, JamfAPIService
+
+
+async def get_health_service_with_db(
+    db: AsyncSession = Depends(get_db),
+    jamf_service: JamfAPIService = Depends(get_jamf_service)
+) -> HealthCheckService:
+    """
+    Dependency injection for HealthCheckService with database session.
+    The Jamf service is a process-wide singleton; only the lightweight
+    wrapper around the request's session is built per request, and FastAPI
+    reuses it for every dependant within that request.
+    """
+    return HealthCheckService(jamf_service, db)
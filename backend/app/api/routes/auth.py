@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
 from pydantic import BaseModel
 from datetime import timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,8 +7,8 @@ from typing import Optional
 
 from app.core.security import (
     create_access_token, 
-    verify_password, 
-    get_password_hash,
+    verify_password_async,
+    verify_and_update_password_async,
     verify_token
 )
 from app.core.config import get_settings
@@ -34,7 +34,8 @@ class LoginResponse(BaseModel):
 async def _authenticate_user(
     username: str, 
     password: str,
-    db: Optional[AsyncSession] = None
+    db: Optional[AsyncSession] = None,
+    request: Optional[Request] = None
 ) -> bool:
     """
     Authenticate user against database or environment configuration.
@@ -45,7 +46,15 @@ async def _authenticate_user(
         user = await user_repo.get_user_by_username(username)
         
         if user and user.is_active:
-            if verify_password(password, user.hashed_password):
+            verified, new_hash = await verify_and_update_password_async(
+                password,
+                user.hashed_password,
+                request
+            )
+            if verified:
+                if new_hash:
+                    await user_repo.update_password_hash(user.id, new_hash)
+                    logger.info(f"Rehashed password for user '{username}' with current settings")
                 await user_repo.update_last_login(user.id)
                 logger.info(f"User '{username}' authenticated successfully via database")
                 return True
@@ -57,7 +66,7 @@ async def _authenticate_user(
             logger.debug(f"User '{username}' not found in database, checking environment config")
     
     if username == settings.admin_username:
-        if verify_password(password, settings.admin_password):
+        if await verify_password_async(password, settings.admin_password, request):
             logger.info(f"User '{username}' authenticated successfully via environment config")
             return True
         else:
@@ -71,6 +80,7 @@ async def _authenticate_user(
 @router.post("/login", response_model=LoginResponse)
 async def login(
     credentials: LoginRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -81,7 +91,8 @@ async def login(
     is_authenticated = await _authenticate_user(
         credentials.username,
         credentials.password,
-        db
+        db,
+        request
     )
     
     if not is_authenticated:
@@ -1,49 +1,42 @@
 from fastapi import APIRouter, Depends, Query
 from typing import Optional
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.device import (
     DeviceHealth, DeviceListResponse, HealthStatus
 )
 from app.services.health_service import HealthCheckService
 from app.core.security import verify_token
-from app.core.database import get_db
-from app.services.jamf_service import get_jamf_service, JamfAPIService
+from app.api.dependencies import get_health_service_with_db
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
 
-async def get_health_service_with_db(
-    db: AsyncSession = Depends(get_db),
-    jamf_service: JamfAPIService = Depends(get_jamf_service)
-) -> HealthCheckService:
-    """
-    Dependency injection for HealthCheckService with database session.
-    """
-    return HealthCheckService(jamf_service, db)
-
-
 @router.get("/", response_model=DeviceListResponse)
 async def get_all_devices(
     status_filter: Optional[HealthStatus] = Query(None),
     use_cache: bool = Query(True, description="Use cached data if available"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of devices to return"),
+    offset: int = Query(0, ge=0, description="Number of devices to skip"),
     health_service: HealthCheckService = Depends(get_health_service_with_db),
     _: dict = Depends(verify_token)
 ):
     """
-    Get all devices with optional status filtering and caching.
+    Get all devices with optional status filtering, pagination and caching.
+    Totals and counts cover every matching device, not just the page.
     """
-    devices = await health_service.check_all_devices(use_cache=use_cache)
-    
-    if status_filter:
-        devices = [d for d in devices if d.status == status_filter]
+    devices, counts = await health_service.list_devices(
+        status=status_filter,
+        use_cache=use_cache,
+        limit=limit,
+        offset=offset
+    )
     
-    healthy = sum(1 for d in devices if d.status == HealthStatus.HEALTHY)
-    caution = sum(1 for d in devices if d.status == HealthStatus.CAUTION)
-    unhealthy = sum(1 for d in devices if d.status == HealthStatus.UNHEALTHY)
+    healthy = counts[HealthStatus.HEALTHY]
+    caution = counts[HealthStatus.CAUTION]
+    unhealthy = counts[HealthStatus.UNHEALTHY]
     
     return DeviceListResponse(
-        total=len(devices),
+        total=healthy + caution + unhealthy,
         devices=devices,
         healthy_count=healthy,
         caution_count=caution,
@@ -73,13 +66,12 @@ async def get_status_summary(
     """
     Get summary statistics of device health status.
     """
-    devices = await health_service.check_all_devices(use_cache=use_cache)
-    
-    healthy = sum(1 for d in devices if d.status == HealthStatus.HEALTHY)
-    caution = sum(1 for d in devices if d.status == HealthStatus.CAUTION)
-    unhealthy = sum(1 for d in devices if d.status == HealthStatus.UNHEALTHY)
+    counts = await health_service.get_status_counts(use_cache=use_cache)
+    healthy = counts[HealthStatus.HEALTHY]
+    caution = counts[HealthStatus.CAUTION]
+    unhealthy = counts[HealthStatus.UNHEALTHY]
     
-    total = len(devices)
+    total = healthy + caution + unhealthy
     
     return {
         "total": total,
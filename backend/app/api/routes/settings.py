@@ -1,25 +1,13 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.device import HealthThresholds
 from app.services.health_service import HealthCheckService
 from app.core.security import verify_token
-from app.core.database import get_db
-from app.services.jamf_service import get_jamf_service, JamfAPIService
+from app.api.dependencies import get_health_service_with_db
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 
-async def get_health_service_with_db(
-    db: AsyncSession = Depends(get_db),
-    jamf_service: JamfAPIService = Depends(get_jamf_service)
-) -> HealthCheckService:
-    """
-    Dependency injection for HealthCheckService with database session.
-    """
-    return HealthCheckService(jamf_service, db)
-
-
 @router.get("/thresholds", response_model=HealthThresholds)
 async def get_thresholds(
     health_service: HealthCheckService = Depends(get_health_service_with_db),
@@ -40,13 +28,11 @@ async def update_thresholds(
     """
     Update health check thresholds.
     """
-    await health_service.set_thresholds(
+    return await health_service.set_thresholds(
         check_in_hours=thresholds.check_in_hours,
         recon_hours=thresholds.recon_hours,
         pending_command_hours=thresholds.pending_command_hours
     )
-    
-    return await health_service.get_thresholds()
 
 
 @router.get("/monitored-groups")
@@ -75,14 +61,10 @@ async def update_monitored_groups(
     """
     Update compliance group and monitored groups configuration.
     """
-    if "compliance_group" in groups:
-        await health_service.set_compliance_group_name(groups["compliance_group"])
-    
-    if "monitored_groups" in groups:
-        await health_service.set_monitored_groups(groups["monitored_groups"])
-    
-    compliance_group = await health_service.get_compliance_group_name()
-    monitored_groups = await health_service.get_monitored_groups()
+    compliance_group, monitored_groups = await health_service.update_group_settings(
+        compliance_group=groups.get("compliance_group"),
+        monitored_groups=groups.get("monitored_groups")
+    )
     
     return {
         "compliance_group": compliance_group,
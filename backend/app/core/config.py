@@ -1,6 +1,5 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, Literal
-from functools import lru_cache
 
 
 class Settings(BaseSettings):
@@ -11,6 +10,10 @@ class Settings(BaseSettings):
     jamf_url: str
     jamf_client_id: str
     jamf_client_secret: str
+    max_jamf_concurrency: int = 20
+    jamf_pool_size: int = 100
+    jamf_max_keepalive_connections: int = 100
+    jamf_keepalive_expiry_seconds: float = 30.0
     
     check_in_threshold_hours: int = 24
     recon_threshold_hours: int = 24
@@ -20,15 +23,24 @@ class Settings(BaseSettings):
     
     secret_key: str
     access_token_expire_minutes: int = 30
+    token_cache_ttl_seconds: int = 60
 
     admin_username: str
     admin_password: str
+    bcrypt_cost: int = 12
+    auth_timeout_seconds: float = 5.0
 
     cache_ttl_seconds: int = 300
+    health_settings_cache_ttl_seconds: int = 30
     
     # Database configuration
     database_path: str = "./jamf_monitor.db"
     
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    query_count_warning_threshold: int = 20
+    
     mysql_host: str = "localhost"
     mysql_port: int = 3306
     mysql_user: str = "jamf_monitor"
@@ -40,6 +52,11 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-@lru_cache()
+_settings: Optional[Settings] = None
+
+
 def get_settings() -> Settings:
-    return Settings()
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
@@ -1,11 +1,22 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Iterator, Optional
 
 settings = get_settings()
 
-Base = declarative_base()
+
+class Base(MappedAsDataclass, DeclarativeBase, kw_only=True):
+    """
+    Declarative base for ORM models.
+    Models are mapped as dataclasses so their constructors are generated once
+    at class creation rather than resolved per instance.
+    """
 
 
 def get_database_url() -> str:
@@ -22,13 +33,66 @@ def get_database_url() -> str:
         )
 
 
+# SQLite connections are local files that never go stale, so the pre-ping
+# round trip and recycling are only worth paying for on MySQL.
+is_sqlite = settings.environment == "development"
+
 engine = create_async_engine(
     get_database_url(),
-    echo=settings.environment == "development",
-    pool_pre_ping=True,
-    pool_recycle=3600,
+    echo=is_sqlite,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_use_lifo=True,
+    pool_pre_ping=not is_sqlite,
+    pool_recycle=-1 if is_sqlite else settings.db_pool_recycle_seconds,
+    query_cache_size=1200,
 )
 
+if is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Use write-ahead logging with relaxed syncing so cache writes do not
+        fsync on every commit. The cached data can always be rebuilt.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+
+
+# Per-request query counter. SQLAlchemy runs cursor events in a greenlet that
+# shares the calling task's context, so the count follows the request.
+_query_counter: ContextVar[Optional[list[int]]] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """
+    Count a statement against the current request, if one is being counted.
+    """
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@contextmanager
+def count_queries() -> Iterator[list[int]]:
+    """
+    Count database statements executed within the block.
+    The count is available as the first item of the yielded list.
+    """
+    counter = [0]
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -51,6 +115,18 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def warm_pool() -> None:
+    """
+    Open the pool's base connections up front so the first requests after
+    startup do not pay the connection handshake.
+    """
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(settings.db_pool_size))
+    )
+    for connection in connections:
+        await connection.close()
+
+
 async def init_db() -> None:
     """
     Initialise database tables.
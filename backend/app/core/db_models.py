@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Index, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.core.database import Base
 from datetime import datetime
+from typing import Optional
 
 
 class ApplicationSettings(Base):
@@ -10,10 +12,12 @@ class ApplicationSettings(Base):
     """
     __tablename__ = "application_settings"
 
-    id = Column(Integer, primary_key=True, index=True)
-    setting_key = Column(String(255), unique=True, nullable=False, index=True)
-    setting_value = Column(Text, nullable=True)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, init=False)
+    setting_key: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    setting_value: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), init=False
+    )
 
     def __repr__(self):
         return f"<ApplicationSettings(key={self.setting_key}, value={self.setting_value})>"
@@ -25,13 +29,17 @@ class HealthThreshold(Base):
     """
     __tablename__ = "health_thresholds"
 
-    id = Column(Integer, primary_key=True, index=True)
-    check_in_hours = Column(Integer, nullable=False, default=24)
-    recon_hours = Column(Integer, nullable=False, default=24)
-    pending_command_hours = Column(Integer, nullable=False, default=6)
-    is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, init=False)
+    check_in_hours: Mapped[int] = mapped_column(Integer, default=24)
+    recon_hours: Mapped[int] = mapped_column(Integer, default=24)
+    pending_command_hours: Mapped[int] = mapped_column(Integer, default=6)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), init=False
+    )
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), init=False
+    )
 
     def __repr__(self):
         return (
@@ -45,49 +53,81 @@ class CachedDeviceHealth(Base):
     Caches device health data to reduce Jamf API calls.
     """
     __tablename__ = "cached_device_health"
-
-    id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(Integer, unique=True, nullable=False, index=True)
-    device_name = Column(String(255), nullable=False)
-    serial_number = Column(String(255), nullable=False, index=True)
-    model = Column(String(255))
-    os_version = Column(String(100))
+    __table_args__ = (
+        Index("ix_cached_device_health_expires_at_device_name", "expires_at", "device_name"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, init=False)
+    device_id: Mapped[int] = mapped_column(Integer, unique=True, index=True)
+    device_name: Mapped[str] = mapped_column(String(255))
+    serial_number: Mapped[str] = mapped_column(String(255), index=True)
+    model: Mapped[Optional[str]] = mapped_column(String(255), default=None)
+    os_version: Mapped[Optional[str]] = mapped_column(String(100), default=None)
     
-    last_contact_time = Column(DateTime(timezone=True))
-    last_inventory_update = Column(DateTime(timezone=True))
+    last_contact_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=None)
+    last_inventory_update: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=None)
     
-    check_in_ok = Column(Boolean, nullable=False)
-    recon_ok = Column(Boolean, nullable=False)
-    has_failed_policies = Column(Boolean, nullable=False)
-    has_failed_mdm_commands = Column(Boolean, nullable=False)
-    has_pending_mdm_commands = Column(Boolean, nullable=False)
-    is_compliant = Column(Boolean, nullable=False)
+    check_in_ok: Mapped[bool] = mapped_column(Boolean)
+    recon_ok: Mapped[bool] = mapped_column(Boolean)
+    has_failed_policies: Mapped[bool] = mapped_column(Boolean)
+    has_failed_mdm_commands: Mapped[bool] = mapped_column(Boolean)
+    has_pending_mdm_commands: Mapped[bool] = mapped_column(Boolean)
+    is_compliant: Mapped[bool] = mapped_column(Boolean)
     
-    smart_group_memberships = Column(JSON)
-    status = Column(String(50), nullable=False, index=True)
+    smart_group_memberships: Mapped[Optional[list]] = mapped_column(JSON, default=None)
+    status: Mapped[str] = mapped_column(String(50), index=True)
     
-    cached_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    cached_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), init=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    settings_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     def __repr__(self):
         return f"<CachedDeviceHealth(device_id={self.device_id}, name={self.device_name}, status={self.status})>"
 
 
+class DeviceHealthSummary(Base):
+    """
+    Single-row rollup of cached device health, refreshed alongside the cache.
+    """
+    __tablename__ = "device_health_summary"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False, default=1)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    healthy: Mapped[int] = mapped_column(Integer, default=0)
+    caution: Mapped[int] = mapped_column(Integer, default=0)
+    unhealthy: Mapped[int] = mapped_column(Integer, default=0)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    settings_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), init=False
+    )
+
+    def __repr__(self):
+        return (
+            f"<DeviceHealthSummary(total={self.total}, healthy={self.healthy}, "
+            f"caution={self.caution}, unhealthy={self.unhealthy})>"
+        )
+
+
 class User(Base):
     """
     User authentication table for future multi-user support.
     """
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(255), unique=True, nullable=False, index=True)
-    hashed_password = Column(String(255), nullable=False)
-    email = Column(String(255), unique=True, nullable=True)
-    full_name = Column(String(255), nullable=True)
-    is_active = Column(Boolean, default=True, nullable=False)
-    is_superuser = Column(Boolean, default=False, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    last_login = Column(DateTime(timezone=True), nullable=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, init=False)
+    username: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    hashed_password: Mapped[str] = mapped_column(String(255))
+    email: Mapped[Optional[str]] = mapped_column(String(255), unique=True, default=None)
+    full_name: Mapped[Optional[str]] = mapped_column(String(255), default=None)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), init=False
+    )
+    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=None)
 
     def __repr__(self):
         return f"<User(username={self.username}, active={self.is_active})>"
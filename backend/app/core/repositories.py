@@ -1,16 +1,93 @@
+import asyncio
+from cachetools import TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from typing import Optional, List
+from sqlalchemy import Integer, String, cast, event, select, update, delete, func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Any, Optional, List, Dict, AsyncIterator, Iterable, Tuple
 from datetime import datetime, timezone, timedelta
-import json
+import orjson
 
+from app.core.config import get_settings
 from app.core.db_models import (
     ApplicationSettings,
     HealthThreshold,
     CachedDeviceHealth,
+    DeviceHealthSummary,
     User
 )
-from app.models.device import HealthThresholds, DeviceHealth
+from app.models.device import HealthThresholds, HealthStatus, DeviceHealth
+
+settings = get_settings()
+
+SUMMARY_ROW_ID = 1
+
+# Bumped with every settings change; cached device health is only served if
+# it was computed under the current version
+SETTINGS_VERSION_KEY = "settings_version"
+
+# Thresholds and group settings are read on every health check but change
+# rarely, so reads are shared across sessions for a short TTL. A write marks
+# its session, and the cached entry is dropped once that session commits.
+# The generation counter stops a load that began before the commit from
+# putting the old values back.
+_settings_cache: TTLCache = TTLCache(maxsize=16, ttl=settings.health_settings_cache_ttl_seconds)
+_settings_cache_lock = asyncio.Lock()
+_settings_generation = 0
+_BOOTSTRAP_CACHE_KEY = "bootstrap"
+_SETTINGS_CHANGED = "settings_changed"
+_SETTINGS_GENERATION = "settings_generation"
+
+
+@event.listens_for(Session, "after_begin")
+def _record_settings_generation(session, transaction, connection):
+    """
+    Note the settings generation a transaction started under, so its reads
+    are only cached if no settings change committed since.
+    """
+    session.info[_SETTINGS_GENERATION] = _settings_generation
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_settings_cache(session):
+    """
+    Drop the cached settings once a transaction that changed them commits.
+    """
+    global _settings_generation
+    if session.info.pop(_SETTINGS_CHANGED, False):
+        _settings_generation += 1
+        _settings_cache.pop(_BOOTSTRAP_CACHE_KEY, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_settings_changes(session):
+    """
+    Forget uncommitted settings changes; the cache never held them.
+    """
+    session.info.pop(_SETTINGS_CHANGED, None)
+
+
+def _upsert(session: AsyncSession, model, columns: Iterable[str], key_columns: List[str]):
+    """
+    Build an INSERT that updates the existing row when the key columns
+    already match, using the syntax of the session's database dialect.
+    Values are passed at execution time, either one dict or a list of
+    dicts for an executemany batch.
+    """
+    update_columns = [column for column in columns if column not in key_columns]
+
+    if session.bind.dialect.name == "mysql":
+        statement = mysql_insert(model)
+        return statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in update_columns}
+        )
+
+    statement = sqlite_insert(model)
+    return statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: statement.excluded[column] for column in update_columns}
+    )
 
 
 class SettingsRepository:
@@ -33,21 +110,17 @@ class SettingsRepository:
 
     async def set_setting(self, key: str, value: str) -> None:
         """
-        Set or update a setting value.
+        Set or update a setting value with a single upsert.
         """
-        result = await self.session.execute(
-            select(ApplicationSettings).where(ApplicationSettings.setting_key == key)
+        values = {
+            "setting_key": key,
+            "setting_value": value,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        await self.session.execute(
+            _upsert(self.session, ApplicationSettings, values.keys(), ["setting_key"]),
+            values
         )
-        setting = result.scalar_one_or_none()
-
-        if setting:
-            setting.setting_value = value
-            setting.updated_at = datetime.now(timezone.utc)
-        else:
-            setting = ApplicationSettings(setting_key=key, setting_value=value)
-            self.session.add(setting)
-
-        await self.session.flush()
 
     async def get_health_thresholds(self) -> Optional[HealthThreshold]:
         """
@@ -57,6 +130,7 @@ class SettingsRepository:
             select(HealthThreshold)
             .where(HealthThreshold.is_active == True)
             .order_by(HealthThreshold.created_at.desc())
+            .limit(1)
         )
         return result.scalar_one_or_none()
 
@@ -83,7 +157,7 @@ class SettingsRepository:
         )
         self.session.add(new_threshold)
         await self.session.flush()
-        await self.session.refresh(new_threshold)
+        await self._record_settings_change()
         
         return new_threshold
 
@@ -91,7 +165,13 @@ class SettingsRepository:
         """
         Get the compliance group name.
         """
-        value = await self.get_setting("compliance_group")
+        compliance_group, _, _, _ = await self.get_bootstrap_settings()
+        return compliance_group
+
+    def _parse_compliance_group(self, value: Optional[str]) -> str:
+        """
+        Parse a stored compliance group name, falling back to the default.
+        """
         return value if value else "Compliance"
 
     async def set_compliance_group(self, group_name: str) -> None:
@@ -99,16 +179,23 @@ class SettingsRepository:
         Set the compliance group name.
         """
         await self.set_setting("compliance_group", group_name)
+        await self._record_settings_change()
 
     async def get_monitored_groups(self) -> List[str]:
         """
         Get the list of monitored groups.
         """
-        value = await self.get_setting("monitored_groups")
+        _, monitored_groups, _, _ = await self.get_bootstrap_settings()
+        return list(monitored_groups)
+
+    def _parse_monitored_groups(self, value: Optional[str]) -> List[str]:
+        """
+        Parse a stored JSON list of monitored groups.
+        """
         if value:
             try:
-                return json.loads(value)
-            except json.JSONDecodeError:
+                return orjson.loads(value)
+            except orjson.JSONDecodeError:
                 return []
         return []
 
@@ -116,7 +203,91 @@ class SettingsRepository:
         """
         Set the list of monitored groups.
         """
-        await self.set_setting("monitored_groups", json.dumps(groups))
+        await self.set_setting("monitored_groups", orjson.dumps(groups).decode())
+        await self._record_settings_change()
+
+    async def _record_settings_change(self) -> None:
+        """
+        Bump the stored settings version in the current transaction, and
+        flag the session so the shared cache is dropped when it commits and
+        bypassed until then.
+        """
+        result = await self.session.execute(
+            update(ApplicationSettings)
+            .where(ApplicationSettings.setting_key == SETTINGS_VERSION_KEY)
+            .values(
+                setting_value=cast(cast(ApplicationSettings.setting_value, Integer) + 1, String),
+                updated_at=datetime.now(timezone.utc)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await self.set_setting(SETTINGS_VERSION_KEY, "1")
+        self.session.info[_SETTINGS_CHANGED] = True
+
+    async def get_settings_version(self) -> int:
+        """
+        Get the current settings version.
+        """
+        _, _, _, settings_version = await self.get_bootstrap_settings()
+        return settings_version
+
+    async def get_bootstrap_settings(
+        self
+    ) -> Tuple[str, Tuple[str, ...], Optional[HealthThresholds], int]:
+        """
+        Get the compliance group, monitored groups, active thresholds and
+        settings version together, from the process-wide cache when it is
+        warm.
+        Concurrent misses wait on the lock so only one load is made.
+        A session with uncommitted settings changes reads its own values
+        and never shares them.
+        """
+        if self.session.info.get(_SETTINGS_CHANGED):
+            return await self._load_bootstrap_settings()
+
+        cached = _settings_cache.get(_BOOTSTRAP_CACHE_KEY)
+        if cached is not None:
+            return cached
+
+        async with _settings_cache_lock:
+            cached = _settings_cache.get(_BOOTSTRAP_CACHE_KEY)
+            if cached is None:
+                cached = await self._load_bootstrap_settings()
+                if self.session.info.get(_SETTINGS_GENERATION) == _settings_generation:
+                    _settings_cache[_BOOTSTRAP_CACHE_KEY] = cached
+        return cached
+
+    async def _load_bootstrap_settings(
+        self
+    ) -> Tuple[str, Tuple[str, ...], Optional[HealthThresholds], int]:
+        """
+        Read the group settings and settings version in a single query, then
+        the active thresholds.
+        """
+        result = await self.session.execute(
+            select(ApplicationSettings.setting_key, ApplicationSettings.setting_value)
+            .where(ApplicationSettings.setting_key.in_(
+                ["compliance_group", "monitored_groups", SETTINGS_VERSION_KEY]
+            ))
+        )
+        values = dict(result.all())
+
+        db_thresholds = await self.get_health_thresholds()
+        thresholds = None
+        if db_thresholds:
+            thresholds = HealthThresholds(
+                check_in_hours=db_thresholds.check_in_hours,
+                recon_hours=db_thresholds.recon_hours,
+                pending_command_hours=db_thresholds.pending_command_hours
+            )
+
+        return (
+            self._parse_compliance_group(values.get("compliance_group")),
+            tuple(self._parse_monitored_groups(values.get("monitored_groups"))),
+            thresholds,
+            int(values.get(SETTINGS_VERSION_KEY) or 0)
+        )
 
 
 class DeviceCacheRepository:
@@ -127,100 +298,249 @@ class DeviceCacheRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_cached_device(self, device_id: int) -> Optional[CachedDeviceHealth]:
+    def _live_rows(self, settings_version: int) -> tuple:
+        """
+        Conditions for cache rows that haven't expired and were computed
+        under the given settings version.
+        """
+        return (
+            CachedDeviceHealth.expires_at > datetime.now(timezone.utc),
+            CachedDeviceHealth.settings_version == settings_version
+        )
+
+    async def get_cached_device(
+        self,
+        device_id: int,
+        settings_version: int
+    ) -> Optional[CachedDeviceHealth]:
         """
-        Get cached device health data if not expired.
+        Get cached device health data if not expired and computed under the
+        given settings version.
         """
         result = await self.session.execute(
             select(CachedDeviceHealth)
             .where(CachedDeviceHealth.device_id == device_id)
-            .where(CachedDeviceHealth.expires_at > datetime.now(timezone.utc))
+            .where(*self._live_rows(settings_version))
         )
         return result.scalar_one_or_none()
 
-    async def get_all_cached_devices(self) -> List[CachedDeviceHealth]:
+    async def get_all_cached_devices(self, settings_version: int) -> List[CachedDeviceHealth]:
         """
-        Get all cached device health data that hasn't expired.
+        Get all cached device health data that hasn't expired and was
+        computed under the given settings version.
         """
         result = await self.session.execute(
             select(CachedDeviceHealth)
-            .where(CachedDeviceHealth.expires_at > datetime.now(timezone.utc))
-            .order_by(CachedDeviceHealth.device_name)
+            .where(*self._live_rows(settings_version))
+            .order_by(CachedDeviceHealth.device_name, CachedDeviceHealth.device_id)
         )
         return list(result.scalars().all())
 
+    async def iter_cached_devices(
+        self,
+        settings_version: int,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> AsyncIterator[CachedDeviceHealth]:
+        """
+        Stream unexpired cached devices for the given settings version in
+        name then id order, optionally filtered by status and paginated,
+        without loading the whole result set at once.
+        """
+        query = select(CachedDeviceHealth).where(*self._live_rows(settings_version))
+        if status:
+            query = query.where(CachedDeviceHealth.status == status)
+
+        query = query.order_by(
+            CachedDeviceHealth.device_name,
+            CachedDeviceHealth.device_id
+        ).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+
+        result = await self.session.stream_scalars(
+            query.execution_options(yield_per=500)
+        )
+        async for cached in result:
+            yield cached
+
+    async def count_by_status(self, settings_version: int) -> Dict[str, int]:
+        """
+        Count cached devices that haven't expired and were computed under the
+        given settings version, grouped by status.
+        """
+        result = await self.session.execute(
+            select(CachedDeviceHealth.status, func.count())
+            .where(*self._live_rows(settings_version))
+            .group_by(CachedDeviceHealth.status)
+        )
+        return {status: count for status, count in result.all()}
+
+    async def get_summary(self) -> Optional[DeviceHealthSummary]:
+        """
+        Get the device health summary row, if one has been recorded.
+        """
+        result = await self.session.execute(
+            select(DeviceHealthSummary).where(DeviceHealthSummary.id == SUMMARY_ROW_ID)
+        )
+        return result.scalar_one_or_none()
+
+    async def refresh_summary(
+        self,
+        settings_version: int,
+        expires_at: datetime
+    ) -> None:
+        """
+        Recount unexpired cached devices for the settings version into the
+        summary row, creating or replacing it with the given expiry.
+        """
+        counts = await self.count_by_status(settings_version)
+        values = {
+            "id": SUMMARY_ROW_ID,
+            "healthy": counts.get(HealthStatus.HEALTHY.value, 0),
+            "caution": counts.get(HealthStatus.CAUTION.value, 0),
+            "unhealthy": counts.get(HealthStatus.UNHEALTHY.value, 0),
+            "expires_at": expires_at,
+            "settings_version": settings_version,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        values["total"] = values["healthy"] + values["caution"] + values["unhealthy"]
+
+        await self.session.execute(
+            _upsert(self.session, DeviceHealthSummary, values.keys(), ["id"]),
+            values
+        )
+
+    async def move_summary_count(
+        self,
+        settings_version: int,
+        from_status: str,
+        to_status: str
+    ) -> None:
+        """
+        Move one device from one status count to another in the summary row,
+        if the row was taken under the given settings version. The total and
+        expiry are unchanged.
+        """
+        if from_status == to_status:
+            return
+
+        from_column = getattr(DeviceHealthSummary, from_status)
+        to_column = getattr(DeviceHealthSummary, to_status)
+        await self.session.execute(
+            update(DeviceHealthSummary)
+            .where(DeviceHealthSummary.id == SUMMARY_ROW_ID)
+            .where(DeviceHealthSummary.settings_version == settings_version)
+            .values({
+                from_column: from_column - 1,
+                to_column: to_column + 1,
+                DeviceHealthSummary.updated_at: datetime.now(timezone.utc)
+            })
+        )
+
+    def _cache_row(
+        self,
+        device_health: DeviceHealth,
+        expires_at: datetime,
+        settings_version: int
+    ) -> Dict[str, Any]:
+        """
+        Flatten device health into column values for the cache table.
+        """
+        return {
+            "device_id": device_health.device.id,
+            "device_name": device_health.device.name,
+            "serial_number": device_health.device.serial_number,
+            "model": device_health.device.model,
+            "os_version": device_health.device.os_version,
+            "last_contact_time": device_health.device.last_contact_time,
+            "last_inventory_update": device_health.device.last_inventory_update,
+            "check_in_ok": device_health.health.check_in_ok,
+            "recon_ok": device_health.health.recon_ok,
+            "has_failed_policies": device_health.health.has_failed_policies,
+            "has_failed_mdm_commands": device_health.health.has_failed_mdm_commands,
+            "has_pending_mdm_commands": device_health.health.has_pending_mdm_commands,
+            "is_compliant": device_health.health.is_compliant,
+            "smart_group_memberships": device_health.health.smart_group_memberships,
+            "status": device_health.status.value,
+            "cached_at": datetime.now(timezone.utc),
+            "expires_at": expires_at,
+            "settings_version": settings_version,
+        }
+
     async def cache_device_health(
         self,
         device_health: DeviceHealth,
+        settings_version: int,
         ttl_seconds: int = 300
-    ) -> CachedDeviceHealth:
+    ) -> Dict[str, Any]:
         """
-        Cache or update device health data.
+        Cache or update device health data with a single upsert.
+        Returns the column values written.
         """
         expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        values = self._cache_row(device_health, expires_at, settings_version)
 
-        result = await self.session.execute(
-            select(CachedDeviceHealth)
-            .where(CachedDeviceHealth.device_id == device_health.device.id)
+        await self.session.execute(
+            _upsert(self.session, CachedDeviceHealth, values.keys(), ["device_id"]),
+            values
         )
-        cached = result.scalar_one_or_none()
-
-        if cached:
-            cached.device_name = device_health.device.name
-            cached.serial_number = device_health.device.serial_number
-            cached.model = device_health.device.model
-            cached.os_version = device_health.device.os_version
-            cached.last_contact_time = device_health.device.last_contact_time
-            cached.last_inventory_update = device_health.device.last_inventory_update
-            cached.check_in_ok = device_health.health.check_in_ok
-            cached.recon_ok = device_health.health.recon_ok
-            cached.has_failed_policies = device_health.health.has_failed_policies
-            cached.has_failed_mdm_commands = device_health.health.has_failed_mdm_commands
-            cached.has_pending_mdm_commands = device_health.health.has_pending_mdm_commands
-            cached.is_compliant = device_health.health.is_compliant
-            cached.smart_group_memberships = device_health.health.smart_group_memberships
-            cached.status = device_health.status.value
-            cached.cached_at = datetime.now(timezone.utc)
-            cached.expires_at = expires_at
-        else:
-            cached = CachedDeviceHealth(
-                device_id=device_health.device.id,
-                device_name=device_health.device.name,
-                serial_number=device_health.device.serial_number,
-                model=device_health.device.model,
-                os_version=device_health.device.os_version,
-                last_contact_time=device_health.device.last_contact_time,
-                last_inventory_update=device_health.device.last_inventory_update,
-                check_in_ok=device_health.health.check_in_ok,
-                recon_ok=device_health.health.recon_ok,
-                has_failed_policies=device_health.health.has_failed_policies,
-                has_failed_mdm_commands=device_health.health.has_failed_mdm_commands,
-                has_pending_mdm_commands=device_health.health.has_pending_mdm_commands,
-                is_compliant=device_health.health.is_compliant,
-                smart_group_memberships=device_health.health.smart_group_memberships,
-                status=device_health.status.value,
-                expires_at=expires_at
-            )
-            self.session.add(cached)
+        return values
 
-        await self.session.flush()
-        return cached
+    async def bulk_cache_device_health(
+        self,
+        devices: List[DeviceHealth],
+        settings_version: int,
+        ttl_seconds: int = 300
+    ) -> int:
+        """
+        Cache or update health data for many devices in one executemany
+        upsert. Returns the number of devices written.
+        """
+        if not devices:
+            return 0
+
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        rows = [
+            self._cache_row(device_health, expires_at, settings_version)
+            for device_health in devices
+        ]
+
+        await self.session.execute(
+            _upsert(self.session, CachedDeviceHealth, rows[0].keys(), ["device_id"]),
+            rows
+        )
+        return len(rows)
+
+    async def delete_devices_except(self, device_ids: Iterable[int]) -> int:
+        """
+        Remove cached devices whose ids are not given, such as devices since
+        removed from Jamf. Returns number of deleted records.
+        """
+        keep = set(device_ids)
+        result = await self.session.execute(select(CachedDeviceHealth.device_id))
+        stale = [device_id for device_id in result.scalars() if device_id not in keep]
+        if not stale:
+            return 0
+
+        result = await self.session.execute(
+            delete(CachedDeviceHealth)
+            .where(CachedDeviceHealth.device_id.in_(stale))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
 
     async def clear_expired_cache(self) -> int:
         """
         Remove expired cache entries. Returns number of deleted records.
         """
         result = await self.session.execute(
-            select(CachedDeviceHealth)
+            delete(CachedDeviceHealth)
             .where(CachedDeviceHealth.expires_at <= datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
         )
-        expired = list(result.scalars().all())
-        
-        for entry in expired:
-            await self.session.delete(entry)
-        
-        await self.session.flush()
-        return len(expired)
+        return result.rowcount
 
 
 class UserRepository:
@@ -260,9 +580,18 @@ class UserRepository:
         )
         self.session.add(user)
         await self.session.flush()
-        await self.session.refresh(user)
         return user
 
+    async def update_password_hash(self, user_id: int, hashed_password: str) -> None:
+        """
+        Replace a user's stored password hash.
+        """
+        await self.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(hashed_password=hashed_password)
+        )
+
     async def update_last_login(self, user_id: int) -> None:
         """
         Update user's last login timestamp.
@@ -1,20 +1,63 @@
+import asyncio
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
+from cachetools import TTLCache
+import jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_cost,
+)
 security = HTTPBearer()
 
 ALGORITHM = "HS256"
 
+# Decoded claims keyed by raw token, so repeat requests skip signature checks.
+# verify_token is a sync dependency and runs in the threadpool, hence the lock.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=settings.token_cache_ttl_seconds)
+_token_cache_lock = threading.Lock()
+
+# bcrypt releases the GIL while hashing, so threads scale across cores. A
+# dedicated pool keeps login bursts from starving the default executor.
+_password_executor: Optional[ThreadPoolExecutor] = None
+
+
+def start_password_executor() -> None:
+    """
+    Create the worker pool used for password verification.
+    Should be called on application startup.
+    """
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            thread_name_prefix="bcrypt"
+        )
+
+
+def shutdown_password_executor() -> None:
+    """
+    Shut down the password verification pool.
+    Should be called on application shutdown.
+    """
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -27,6 +70,95 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password and, when the stored hash uses outdated settings such
+    as a different bcrypt cost, return a fresh hash to replace it with.
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        logger.error(f"Error verifying password: {e}")
+        return False, None
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """
+    Return once the client behind the request has disconnected.
+    """
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.1)
+
+
+async def verify_password_async(
+    plain_password: str,
+    hashed_password: str,
+    request: Optional[Request] = None
+) -> bool:
+    """
+    Verify a password on the password worker pool without blocking the
+    event loop.
+    """
+    verified, _ = await verify_and_update_password_async(
+        plain_password,
+        hashed_password,
+        request
+    )
+    return verified
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str,
+    request: Optional[Request] = None
+) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password worker pool, returning a replacement
+    hash when the stored one is outdated.
+    Gives up early if the client disconnects (408) or the configured auth
+    timeout is exceeded (503), so abandoned logins do not hold the request
+    open. A verification still queued on the pool is cancelled; one already
+    running cannot be interrupted.
+    """
+    verify_task = asyncio.get_running_loop().run_in_executor(
+        _password_executor,
+        verify_and_update_password,
+        plain_password,
+        hashed_password
+    )
+    tasks = {verify_task}
+    if request is not None:
+        tasks.add(asyncio.ensure_future(_wait_for_disconnect(request)))
+
+    done, pending = await asyncio.wait(
+        tasks,
+        timeout=settings.auth_timeout_seconds,
+        return_when=asyncio.FIRST_COMPLETED
+    )
+    for task in pending:
+        task.cancel()
+
+    if verify_task in done:
+        return verify_task.result()
+
+    if done:
+        logger.info("Client disconnected during password verification")
+        raise HTTPException(
+            status_code=status.HTTP_408_REQUEST_TIMEOUT,
+            detail="Client disconnected during authentication"
+        )
+
+    logger.warning("Password verification timed out")
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is temporarily unavailable, try again later",
+        headers={"Retry-After": str(max(1, round(settings.auth_timeout_seconds)))}
+    )
+
+
 def get_password_hash(password: str) -> str:
     """
     Hash a password using bcrypt.
@@ -42,11 +174,19 @@ def validate_password_strength(password: str) -> bool:
     if len(password) < 8:
         return False
     
-    has_upper = any(c.isupper() for c in password)
-    has_lower = any(c.islower() for c in password)
-    has_digit = any(c.isdigit() for c in password)
+    has_upper = has_lower = has_digit = False
+    for c in password:
+        if c.isupper():
+            has_upper = True
+        elif c.islower():
+            has_lower = True
+        elif c.isdigit():
+            has_digit = True
+        
+        if has_upper and has_lower and has_digit:
+            return True
     
-    return has_upper and has_lower and has_digit
+    return False
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -69,18 +209,40 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def _get_cached_claims(token: str) -> Optional[dict]:
+    """
+    Return cached claims for a token if they have not yet expired.
+    """
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+        if payload is None:
+            return None
+        if payload.get("exp", 0) <= time.time():
+            _token_cache.pop(token, None)
+            return None
+        return payload
+
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Verify and decode a JWT token.
+    Decoded claims are cached briefly so repeat requests skip verification.
     """
+    token = credentials.credentials
+    payload = _get_cached_claims(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(
-            credentials.credentials, 
+            token, 
             settings.secret_key, 
             algorithms=[ALGORITHM]
         )
+        with _token_cache_lock:
+            _token_cache[token] = payload
         return payload
-    except JWTError as e:
+    except jwt.PyJWTError as e:
         logger.warning(f"Invalid token received: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
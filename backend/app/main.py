@@ -1,12 +1,17 @@
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.config import get_settings
-from app.core.security import validate_secret_key
-from app.core.database import init_db
+from app.core.security import (
+    validate_secret_key, start_password_executor, shutdown_password_executor
+)
+from app.core.database import init_db, warm_pool, count_queries
 from app.api.routes import devices, settings, auth
+from app.services.jamf_service import JamfAPIService
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +38,9 @@ async def lifespan(app: FastAPI):
     if not validate_secret_key():
         logger.critical("SECRET_KEY validation failed. Application may be insecure.")
     
+    start_password_executor()
+    app.state.jamf = JamfAPIService()
+    
     if settings_config.environment == "development":
         logger.info("Initialising development database (SQLite)")
         try:
@@ -42,11 +50,42 @@ async def lifespan(app: FastAPI):
             logger.error(f"Failed to initialise database: {e}")
             logger.warning("Application will continue with in-memory storage")
     
+    try:
+        await warm_pool()
+    except Exception as e:
+        logger.warning(f"Failed to warm database connection pool: {e}")
+    
     logger.info(f"API documentation available at /api/{settings_config.api_version}/docs")
     
     yield
     
     logger.info("Shutting down application")
+    await app.state.jamf.aclose()
+    shutdown_password_executor()
+
+
+class QueryCountMiddleware:
+    """
+    Warn when a single request runs more database statements than expected,
+    so N+1 query patterns show up in the logs.
+    A plain ASGI middleware, so responses are passed straight through.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with count_queries() as query_count:
+            await self.app(scope, receive, send)
+        
+        if query_count[0] > settings_config.query_count_warning_threshold:
+            logger.warning(
+                f"{scope['method']} {scope['path']} ran {query_count[0]} database queries"
+            )
 
 
 app = FastAPI(
@@ -55,6 +94,7 @@ app = FastAPI(
     docs_url=f"/api/{settings_config.api_version}/docs",
     redoc_url=f"/api/{settings_config.api_version}/redoc",
     openapi_url=f"/api/{settings_config.api_version}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -65,6 +105,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryCountMiddleware)
+
 
 app.include_router(auth.router, prefix=f"/api/{settings_config.api_version}")
 app.include_router(devices.router, prefix=f"/api/{settings_config.api_version}")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional, Literal
 from enum import Enum
@@ -30,13 +30,13 @@ class HealthCheckResult(BaseModel):
     smart_group_memberships: list[str] = []
     
     def calculate_status(self) -> HealthStatus:
-        if any([
-            not self.check_in_ok,
-            not self.recon_ok,
-            self.has_failed_policies,
-            self.has_failed_mdm_commands,
-            self.has_pending_mdm_commands
-        ]):
+        if (
+            not self.check_in_ok
+            or not self.recon_ok
+            or self.has_failed_policies
+            or self.has_failed_mdm_commands
+            or self.has_pending_mdm_commands
+        ):
             return HealthStatus.UNHEALTHY
         
         if not self.is_compliant or self.smart_group_memberships:
@@ -46,6 +46,8 @@ class HealthCheckResult(BaseModel):
 
 
 class DeviceHealth(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     device: DeviceBasicInfo
     health: HealthCheckResult
     status: HealthStatus
@@ -53,6 +55,8 @@ class DeviceHealth(BaseModel):
 
 
 class DeviceListResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     total: int
     devices: list[DeviceHealth]
     healthy_count: int
@@ -6,6 +6,7 @@ Use this for development. In production, use Alembic migrations.
 """
 
 import asyncio
+from sqlalchemy import select
 from app.core.database import init_db, AsyncSessionLocal
 from app.core.db_models import HealthThreshold, ApplicationSettings, User
 from app.core.security import get_password_hash
@@ -20,38 +21,49 @@ async def create_default_settings():
     """
     async with AsyncSessionLocal() as session:
         try:
-            # Create default health thresholds
-            threshold = HealthThreshold(
-                check_in_hours=settings.check_in_threshold_hours,
-                recon_hours=settings.recon_threshold_hours,
-                pending_command_hours=settings.pending_command_threshold_hours,
-                is_active=True
+            # Create default health thresholds unless an active set exists
+            active_threshold = await session.scalar(
+                select(HealthThreshold.id)
+                .where(HealthThreshold.is_active == True)
+                .limit(1)
             )
-            session.add(threshold)
+            if active_threshold is None:
+                threshold = HealthThreshold(
+                    check_in_hours=settings.check_in_threshold_hours,
+                    recon_hours=settings.recon_threshold_hours,
+                    pending_command_hours=settings.pending_command_threshold_hours,
+                    is_active=True
+                )
+                session.add(threshold)
             
-            # Create default compliance group setting
-            compliance_setting = ApplicationSettings(
-                setting_key="compliance_group",
-                setting_value="Compliance"
-            )
-            session.add(compliance_setting)
+            defaults = {
+                "compliance_group": "Compliance",
+                "monitored_groups": "[]",
+                "settings_version": "0"
+            }
+            existing_keys = set(await session.scalars(
+                select(ApplicationSettings.setting_key)
+                .where(ApplicationSettings.setting_key.in_(list(defaults)))
+            ))
             
-            # Create default monitored groups setting
-            monitored_setting = ApplicationSettings(
-                setting_key="monitored_groups",
-                setting_value="[]"
-            )
-            session.add(monitored_setting)
+            # Create default group settings and the settings version
+            for key, value in defaults.items():
+                if key not in existing_keys:
+                    session.add(ApplicationSettings(setting_key=key, setting_value=value))
             
             # Create admin user if it doesn't exist
-            admin_user = User(
-                username=settings.admin_username,
-                hashed_password=settings.admin_password,
-                full_name="Administrator",
-                is_superuser=True,
-                is_active=True
+            admin_exists = await session.scalar(
+                select(User.id).where(User.username == settings.admin_username)
             )
-            session.add(admin_user)
+            if admin_exists is None:
+                admin_user = User(
+                    username=settings.admin_username,
+                    hashed_password=settings.admin_password,
+                    full_name="Administrator",
+                    is_superuser=True,
+                    is_active=True
+                )
+                session.add(admin_user)
             
             await session.commit()
             print("✓ Default settings created successfully")
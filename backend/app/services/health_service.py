@@ -1,4 +1,7 @@
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -6,13 +9,128 @@ from app.models.device import (
     DeviceHealth, DeviceBasicInfo, HealthCheckResult, 
     HealthStatus, HealthThresholds
 )
-from app.services.jamf_service import JamfAPIService
+from app.services.jamf_service import JamfAPIService, JamfAuthenticationError
 from app.core.config import get_settings
 from app.core.repositories import SettingsRepository, DeviceCacheRepository
+from app.core.db_models import CachedDeviceHealth, DeviceHealthSummary
+from app.utils.cache import SegmentedLRUCache
 import asyncio
 
 settings = get_settings()
 
+# Inventory sections that cover a device's basic info and group memberships,
+# so a fleet check can skip the per-device detail and membership calls.
+INVENTORY_SECTIONS = ["GENERAL", "GROUP_MEMBERSHIPS"]
+
+# Placeholders for devices missing fields in their Jamf record. The empty
+# section is read-only so it can be shared between checks.
+_UNKNOWN = "Unknown"
+_EMPTY_SECTION = MappingProxyType({})
+
+# Upper bound on devices held in the in-process cache, sized to cover the
+# devices dashboards poll repeatedly rather than the whole fleet.
+DEVICE_L1_MAXSIZE = 4096
+
+
+def _device_l1_expiry(key: tuple[int, int], device_health: DeviceHealth, now: float) -> float:
+    """
+    Expire an in-process entry when its database cache row would expire,
+    so the in-process tier never outlives the database tier.
+    """
+    last_checked = device_health.last_checked
+    if last_checked.tzinfo is None:
+        last_checked = last_checked.replace(tzinfo=timezone.utc)
+    remaining = (
+        last_checked + timedelta(seconds=settings.cache_ttl_seconds)
+        - datetime.now(timezone.utc)
+    ).total_seconds()
+    return now + remaining
+
+
+# In-process tier in front of the database cache, keyed on settings version
+# and computer id, so entries from before a settings change are never read
+# again, in this process or any other. Fleet checks only write to it, so
+# their results stay in probation and cannot push out devices that are read
+# repeatedly.
+_device_l1 = SegmentedLRUCache(maxsize=DEVICE_L1_MAXSIZE, ttu=_device_l1_expiry)
+
+
+async def _gather_or_raise(*aws):
+    """
+    Run awaitables concurrently and return their results in order.
+    Every call is allowed to finish before the first failure is re-raised,
+    so no sibling is left running against shared state.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+@dataclass(frozen=True)
+class ThresholdTimestamps:
+    """
+    Cut-off times derived from the health thresholds, computed once so a
+    batch of device checks shares a single clock reading.
+    """
+    check_in_after: datetime
+    recon_after: datetime
+    pending_before: datetime
+    
+    @classmethod
+    def from_thresholds(cls, thresholds: HealthThresholds) -> "ThresholdTimestamps":
+        """
+        Build cut-off times relative to the current time.
+        """
+        now = datetime.now(timezone.utc)
+        return cls(
+            check_in_after=now - timedelta(hours=thresholds.check_in_hours),
+            recon_after=now - timedelta(hours=thresholds.recon_hours),
+            pending_before=now - timedelta(hours=thresholds.pending_command_hours)
+        )
+
+
+@dataclass(frozen=True)
+class HealthRunContext:
+    """
+    Settings resolved once and shared by every device check in a run.
+    """
+    cutoffs: ThresholdTimestamps
+    compliance_group: str
+    monitored_groups: frozenset[str]
+    settings_version: int
+
+
+@dataclass
+class DeviceIndex:
+    """
+    Device health results grouped by status, built in one pass so callers
+    can filter and count without rescanning the list.
+    """
+    all: list[DeviceHealth] = field(default_factory=list)
+    by_status: dict[HealthStatus, list[DeviceHealth]] = field(default_factory=dict)
+    counts: Counter = field(default_factory=Counter)
+    settings_version: int = 0
+    
+    @classmethod
+    def from_devices(cls, devices: list[DeviceHealth], settings_version: int = 0) -> "DeviceIndex":
+        """
+        Index a list of device health results, checked under the given
+        settings version, by status.
+        """
+        by_status: dict[HealthStatus, list[DeviceHealth]] = {}
+        for device in devices:
+            by_status.setdefault(device.status, []).append(device)
+        
+        counts = Counter({status: len(group) for status, group in by_status.items()})
+        return cls(
+            all=devices,
+            by_status=by_status,
+            counts=counts,
+            settings_version=settings_version
+        )
+
 
 class HealthCheckService:
     """
@@ -52,14 +170,16 @@ class HealthCheckService:
         Get health check thresholds from database or defaults.
         """
         if self.settings_repo:
-            db_thresholds = await self.settings_repo.get_health_thresholds()
-            if db_thresholds:
-                return HealthThresholds(
-                    check_in_hours=db_thresholds.check_in_hours,
-                    recon_hours=db_thresholds.recon_hours,
-                    pending_command_hours=db_thresholds.pending_command_hours
-                )
+            _, _, thresholds, _ = await self.settings_repo.get_bootstrap_settings()
+            if thresholds:
+                return thresholds
         
+        return self._default_thresholds()
+    
+    def _default_thresholds(self) -> HealthThresholds:
+        """
+        Build health check thresholds from environment configuration.
+        """
         return HealthThresholds(
             check_in_hours=settings.check_in_threshold_hours,
             recon_hours=settings.recon_threshold_hours,
@@ -71,31 +191,36 @@ class HealthCheckService:
         check_in_hours: Optional[int] = None,
         recon_hours: Optional[int] = None,
         pending_command_hours: Optional[int] = None
-    ) -> None:
+    ) -> HealthThresholds:
         """
-        Update health check thresholds.
+        Update health check thresholds and return the values now in effect.
         """
         current = await self.get_thresholds()
         
-        new_check_in = check_in_hours if check_in_hours is not None else current.check_in_hours
-        new_recon = recon_hours if recon_hours is not None else current.recon_hours
-        new_pending = (
-            pending_command_hours 
-            if pending_command_hours is not None 
-            else current.pending_command_hours
+        updated = HealthThresholds(
+            check_in_hours=check_in_hours if check_in_hours is not None else current.check_in_hours,
+            recon_hours=recon_hours if recon_hours is not None else current.recon_hours,
+            pending_command_hours=(
+                pending_command_hours 
+                if pending_command_hours is not None 
+                else current.pending_command_hours
+            )
         )
         
         if self.settings_repo:
             await self.settings_repo.update_health_thresholds(
-                check_in_hours=new_check_in,
-                recon_hours=new_recon,
-                pending_command_hours=new_pending
+                check_in_hours=updated.check_in_hours,
+                recon_hours=updated.recon_hours,
+                pending_command_hours=updated.pending_command_hours
             )
         else:
             # Fallback to environment settings
-            settings.check_in_threshold_hours = new_check_in
-            settings.recon_threshold_hours = new_recon
-            settings.pending_command_threshold_hours = new_pending
+            settings.check_in_threshold_hours = updated.check_in_hours
+            settings.recon_threshold_hours = updated.recon_hours
+            settings.pending_command_threshold_hours = updated.pending_command_hours
+        
+        await self._invalidate_device_cache()
+        return updated
     
     async def get_compliance_group_name(self) -> str:
         """
@@ -113,6 +238,8 @@ class HealthCheckService:
             await self.settings_repo.set_compliance_group(name)
         else:
             self._compliance_group_name = name
+        
+        await self._invalidate_device_cache()
     
     async def get_monitored_groups(self) -> list[str]:
         """
@@ -130,63 +257,121 @@ class HealthCheckService:
             await self.settings_repo.set_monitored_groups(groups)
         else:
             self._monitored_groups = groups
+        
+        await self._invalidate_device_cache()
+    
+    async def get_settings_version(self) -> int:
+        """
+        Get the version of the settings cached device health must match.
+        """
+        if self.settings_repo:
+            return await self.settings_repo.get_settings_version()
+        return 0
+    
+    async def _invalidate_device_cache(self) -> None:
+        """
+        Drop this process's in-memory device health after a settings change.
+        With a database, cached rows and other processes' entries are keyed
+        on the settings version, which the change bumps; clearing here frees
+        the memory and covers the in-memory fallback, whose version is fixed.
+        """
+        _device_l1.clear()
+    
+    async def update_group_settings(
+        self,
+        compliance_group: Optional[str] = None,
+        monitored_groups: Optional[list[str]] = None
+    ) -> tuple[str, list[str]]:
+        """
+        Update whichever group settings are given and return the compliance
+        group and monitored groups now in effect.
+        """
+        if compliance_group is not None:
+            await self.set_compliance_group_name(compliance_group)
+        else:
+            compliance_group = await self.get_compliance_group_name()
+        
+        if monitored_groups is not None:
+            await self.set_monitored_groups(monitored_groups)
+        else:
+            monitored_groups = await self.get_monitored_groups()
+        
+        return compliance_group, list(monitored_groups)
     
     async def check_device_health(
         self, 
         computer_id: int,
-        use_cache: bool = True
+        use_cache: bool = True,
+        persist: bool = True,
+        ctx: Optional[HealthRunContext] = None,
+        inventory: Optional[dict] = None
     ) -> DeviceHealth:
         """
         Check device health, using cache if available and not expired.
+        Cached results are looked up in memory first, then in the database.
+        Batch callers pass a shared run context and the device's prefetched
+        inventory record; otherwise settings are resolved for this check and
+        the details are fetched from Jamf.
+        Fresh results are cached, and a device already in the summary row has
+        its count moved to the new status, unless persist is False, which
+        lets a full refresh write them in one batch.
         """
-        if use_cache and self.cache_repo:
-            cached = await self.cache_repo.get_cached_device(computer_id)
+        ctx = await self._resolve_context(ctx)
+        l1_key = (ctx.settings_version, computer_id)
+        
+        if use_cache:
+            device_health = _device_l1.get(l1_key)
+            if device_health:
+                return device_health
+        
+        previous_status = None
+        if self.cache_repo and (use_cache or persist):
+            cached = await self.cache_repo.get_cached_device(computer_id, ctx.settings_version)
+            if cached and use_cache:
+                device_health = self._device_health_from_cache(cached)
+                _device_l1[l1_key] = device_health
+                return device_health
             if cached:
-                return self._device_health_from_cache(cached)
+                previous_status = cached.status
         
-        computer_detail = await self.jamf_service.get_computer_detail(computer_id)
+        (
+            computer_detail,
+            has_failed_policies,
+            mdm_commands,
+            group_memberships
+        ) = await _gather_or_raise(
+            self._get_computer_detail(computer_id, inventory),
+            self.jamf_service.has_failed_policies(computer_id),
+            self.jamf_service.get_mdm_commands(computer_id),
+            self._get_group_memberships(computer_id, inventory)
+        )
         
-        general = computer_detail.get("general", {})
+        general = computer_detail.get("general") or _EMPTY_SECTION
         
         device_info = DeviceBasicInfo(
             id=computer_id,
-            name=general.get("name", "Unknown"),
-            serial_number=general.get("serialNumber", "Unknown"),
-            model=general.get("modelIdentifier", "Unknown"),
-            os_version=general.get("operatingSystemVersion", "Unknown"),
+            name=general.get("name", _UNKNOWN),
+            serial_number=general.get("serialNumber", _UNKNOWN),
+            model=general.get("modelIdentifier", _UNKNOWN),
+            os_version=general.get("operatingSystemVersion", _UNKNOWN),
             last_contact_time=self._parse_jamf_date(general.get("lastContactTime")),
             last_inventory_update=self._parse_jamf_date(general.get("lastInventoryUpdateTimestamp"))
         )
         
-        thresholds = await self.get_thresholds()
+        check_in_ok = self._is_after(device_info.last_contact_time, ctx.cutoffs.check_in_after)
+        recon_ok = self._is_after(device_info.last_inventory_update, ctx.cutoffs.recon_after)
         
-        check_in_ok = self._check_recent_contact(
-            device_info.last_contact_time, 
-            thresholds.check_in_hours
-        )
-        recon_ok = self._check_recent_recon(
-            device_info.last_inventory_update,
-            thresholds.recon_hours
-        )
-        
-        failed_policies = await self.jamf_service.get_failed_policies(computer_id)
-        has_failed_policies = len(failed_policies) > 0
-        
-        mdm_commands = await self.jamf_service.get_mdm_commands(computer_id)
         has_failed_mdm = len(mdm_commands["failed"]) > 0
         has_pending_mdm = self._check_pending_commands(
             mdm_commands["pending"],
-            thresholds.pending_command_hours
+            ctx.cutoffs.pending_before
         )
         
-        group_memberships = await self.jamf_service.get_computer_group_membership(computer_id)
-        compliance_group = await self.get_compliance_group_name()
-        is_compliant = compliance_group in group_memberships
+        is_compliant = ctx.compliance_group in group_memberships
         
-        monitored_groups = await self.get_monitored_groups()
         monitored_group_matches = [
             g for g in group_memberships 
-            if g in monitored_groups and g != compliance_group
+            if g in ctx.monitored_groups and g != ctx.compliance_group
         ]
         
         health_result = HealthCheckResult(
@@ -208,40 +393,258 @@ class HealthCheckService:
             last_checked=datetime.now(timezone.utc)
         )
         
-        if self.cache_repo:
+        if persist and self.cache_repo:
             await self.cache_repo.cache_device_health(
                 device_health,
+                ctx.settings_version,
                 ttl_seconds=settings.cache_ttl_seconds
             )
+            # Only a device with a live row is counted in the summary
+            if previous_status:
+                await self.cache_repo.move_summary_count(
+                    ctx.settings_version,
+                    previous_status,
+                    status.value
+                )
+            _device_l1[l1_key] = device_health
         
         return device_health
     
-    async def check_all_devices(self, use_cache: bool = True) -> list[DeviceHealth]:
+    async def check_all_devices(self, use_cache: bool = True) -> DeviceIndex:
         """
         Check health for all devices, using cache where available.
+        Uncached devices are checked concurrently, at most
+        max_jamf_concurrency at a time, and written back in one batch.
+        A Jamf authentication failure cancels the remaining checks and is
+        raised once the checks that finished are cached; other per-device
+        failures are recorded and the run carries on.
+        Drops cached devices that are no longer in the inventory, and
+        rebuilds the summary row once every device has been checked.
         """
-        computers = await self.jamf_service.get_all_computers()
+        # Resolving settings up front means the concurrent checks below
+        # never need the session.
+        ctx = await self._build_context()
+        
+        computers, cached_by_id = await self._fetch_computers_and_cache(
+            use_cache,
+            ctx.settings_version
+        )
+        inventory_by_id = {int(computer["id"]): computer for computer in computers}
         
-        results = []
+        snapshot_expires_at = datetime.now(timezone.utc) + timedelta(
+            seconds=settings.cache_ttl_seconds
+        )
+        device_ids = list(inventory_by_id)
+        healths: dict[int, DeviceHealth] = {}
+        
+        for computer_id in device_ids:
+            cached = cached_by_id.get(computer_id)
+            if cached:
+                healths[computer_id] = self._device_health_from_cache(cached)
+                snapshot_expires_at = min(
+                    snapshot_expires_at,
+                    self._as_utc(cached.expires_at)
+                )
+        
+        uncached_ids = [computer_id for computer_id in device_ids if computer_id not in healths]
+        checked = []
         errors = []
+        auth_error = None
         
-        for computer in computers:
+        if uncached_ids:
+            semaphore = asyncio.Semaphore(settings.max_jamf_concurrency)
+            
+            async def check(computer_id: int) -> None:
+                async with semaphore:
+                    try:
+                        healths[computer_id] = await self.check_device_health(
+                            computer_id,
+                            use_cache=False,
+                            persist=False,
+                            ctx=ctx,
+                            inventory=inventory_by_id[computer_id]
+                        )
+                    except JamfAuthenticationError:
+                        raise
+                    except Exception as e:
+                        errors.append({
+                            "device_id": computer_id,
+                            "error": str(e)
+                        })
+            
             try:
-                device_health = await self.check_device_health(
-                    computer["id"],
-                    use_cache=use_cache
-                )
-                results.append(device_health)
-            except Exception as e:
-                errors.append({
-                    "device_id": computer["id"],
-                    "error": str(e)
-                })
+                async with asyncio.TaskGroup() as task_group:
+                    for computer_id in uncached_ids:
+                        task_group.create_task(check(computer_id))
+            except BaseExceptionGroup as group:
+                # The first authentication failure has cancelled the other
+                # checks; it is raised once the finished ones are saved
+                auth_error = group.exceptions[0]
+            
+            checked = [healths[computer_id] for computer_id in uncached_ids if computer_id in healths]
+        
+        results = [healths[computer_id] for computer_id in device_ids if computer_id in healths]
+        
+        if self.cache_repo:
+            # Only the current inventory is listed and counted
+            await self.cache_repo.delete_devices_except(device_ids)
+            await self.cache_repo.bulk_cache_device_health(
+                checked,
+                ctx.settings_version,
+                ttl_seconds=settings.cache_ttl_seconds
+            )
+            for device_health in checked:
+                _device_l1[(ctx.settings_version, device_health.device.id)] = device_health
+        
+        if auth_error:
+            if self.db_session:
+                # The request's session rolls back on error, so commit the
+                # finished checks first
+                await self.db_session.commit()
+            raise auth_error
         
         if errors:
             print(f"Failed to check {len(errors)} devices: {errors}")
+        elif self.cache_repo:
+            await self.cache_repo.refresh_summary(
+                ctx.settings_version,
+                expires_at=snapshot_expires_at
+            )
+        
+        return DeviceIndex.from_devices(results, ctx.settings_version)
+    
+    async def _fetch_computers_and_cache(
+        self,
+        use_cache: bool,
+        settings_version: int
+    ) -> tuple[list[dict], dict[int, CachedDeviceHealth]]:
+        """
+        Fetch the Jamf inventory and the unexpired cache rows for the
+        settings version concurrently.
+        Only the cache read touches the session, so the overlap is safe. Both
+        calls finish before any error is raised so the session is never left
+        mid-query.
+        """
+        async def load_cache() -> dict[int, CachedDeviceHealth]:
+            if not (use_cache and self.cache_repo):
+                return {}
+            return {
+                cached.device_id: cached
+                for cached in await self.cache_repo.get_all_cached_devices(settings_version)
+            }
         
-        return results
+        computers, cached_by_id = await _gather_or_raise(
+            self.jamf_service.get_all_computers_inventory(INVENTORY_SECTIONS),
+            load_cache()
+        )
+        return computers, cached_by_id
+    
+    async def _get_fresh_summary(self, settings_version: int) -> Optional[DeviceHealthSummary]:
+        """
+        Get the summary row if the database cache holds a complete,
+        unexpired fleet snapshot taken under the given settings version.
+        """
+        if not self.cache_repo:
+            return None
+        
+        summary = await self.cache_repo.get_summary()
+        if (
+            summary
+            and summary.settings_version == settings_version
+            and self._as_utc(summary.expires_at) > datetime.now(timezone.utc)
+        ):
+            return summary
+        return None
+    
+    async def list_devices(
+        self,
+        status: Optional[HealthStatus] = None,
+        use_cache: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> tuple[list[DeviceHealth], Counter]:
+        """
+        List a page of device health, optionally filtered by status, along
+        with per-status counts for the whole filtered set.
+        Pages always come from the database cache in name order, so paging
+        is stable whether or not the fleet had to be re-checked first. Counts
+        come from the summary row when a fresh fleet snapshot is cached.
+        """
+        settings_version = await self.get_settings_version()
+        summary = await self._get_fresh_summary(settings_version) if use_cache else None
+        if summary:
+            counts = self._summary_counts(summary)
+        else:
+            index = await self.check_all_devices(use_cache=use_cache)
+            if not self.cache_repo:
+                return self._page_from_index(index, status, limit, offset)
+            
+            settings_version = index.settings_version
+            counts = Counter({
+                HealthStatus(cached_status): count
+                for cached_status, count in (
+                    await self.cache_repo.count_by_status(settings_version)
+                ).items()
+            })
+        
+        if status:
+            counts = Counter({status: counts[status]})
+        
+        devices = [
+            self._device_health_from_cache(cached)
+            async for cached in self.cache_repo.iter_cached_devices(
+                settings_version,
+                status=status.value if status else None,
+                limit=limit,
+                offset=offset
+            )
+        ]
+        return devices, counts
+    
+    def _page_from_index(
+        self,
+        index: DeviceIndex,
+        status: Optional[HealthStatus],
+        limit: Optional[int],
+        offset: int
+    ) -> tuple[list[DeviceHealth], Counter]:
+        """
+        Page through in-memory results when there is no database cache,
+        ordered by name then id to match iter_cached_devices.
+        """
+        if status:
+            devices = index.by_status.get(status, [])
+            counts = Counter({status: index.counts[status]})
+        else:
+            devices = index.all
+            counts = index.counts
+        
+        devices = sorted(devices, key=lambda d: (d.device.name, d.device.id))
+        end = offset + limit if limit is not None else None
+        return devices[offset:end], counts
+    
+    def _summary_counts(self, summary: DeviceHealthSummary) -> Counter:
+        """
+        Convert the summary row into per-status counts.
+        """
+        return Counter({
+            HealthStatus.HEALTHY: summary.healthy,
+            HealthStatus.CAUTION: summary.caution,
+            HealthStatus.UNHEALTHY: summary.unhealthy
+        })
+    
+    async def get_status_counts(self, use_cache: bool = True) -> Counter:
+        """
+        Count devices per health status.
+        Reads the summary row when a fresh fleet snapshot is cached.
+        """
+        settings_version = await self.get_settings_version()
+        summary = await self._get_fresh_summary(settings_version) if use_cache else None
+        if summary:
+            return self._summary_counts(summary)
+        
+        index = await self.check_all_devices(use_cache=use_cache)
+        return index.counts
     
     def _device_health_from_cache(self, cached) -> DeviceHealth:
         """
@@ -274,6 +677,14 @@ class HealthCheckService:
             last_checked=cached.cached_at
         )
     
+    def _as_utc(self, value: datetime) -> datetime:
+        """
+        Treat naive datetimes read back from SQLite as UTC.
+        """
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+    
     def _parse_jamf_date(self, date_string: Optional[str]) -> Optional[datetime]:
         """
         Parse Jamf date strings to datetime objects.
@@ -282,54 +693,82 @@ class HealthCheckService:
             return None
         
         try:
-            return datetime.fromisoformat(date_string.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
+            return datetime.fromisoformat(date_string)
+        except (ValueError, TypeError):
             return None
     
-    def _check_recent_contact(
-        self, 
-        last_contact: Optional[datetime],
-        threshold_hours: int
-    ) -> bool:
+    async def _get_computer_detail(
+        self,
+        computer_id: int,
+        inventory: Optional[dict]
+    ) -> dict:
         """
-        Check if device has contacted recently within threshold.
+        Return the prefetched inventory record, or fetch the device's details.
         """
-        if not last_contact:
-            return False
-        
-        threshold = datetime.now(timezone.utc) - timedelta(hours=threshold_hours)
-        return last_contact > threshold
+        if inventory is not None:
+            return inventory
+        return await self.jamf_service.get_computer_detail(computer_id)
     
-    def _check_recent_recon(
+    async def _get_group_memberships(
         self,
-        last_recon: Optional[datetime],
-        threshold_hours: int
-    ) -> bool:
+        computer_id: int,
+        inventory: Optional[dict]
+    ) -> list[str]:
+        """
+        Return group names from the prefetched inventory record, or fetch the
+        device's memberships.
+        """
+        if inventory is not None:
+            return [
+                group.get("groupName")
+                for group in inventory.get("groupMemberships", [])
+                if group.get("groupName")
+            ]
+        return await self.jamf_service.get_computer_group_membership(computer_id)
+    
+    async def _build_context(self) -> HealthRunContext:
         """
-        Check if device has run recon recently within threshold.
+        Resolve thresholds, group settings and the settings version for a
+        run of device checks.
         """
-        if not last_recon:
-            return False
+        thresholds = await self.get_thresholds()
+        compliance_group = await self.get_compliance_group_name()
+        monitored_groups = await self.get_monitored_groups()
+        settings_version = await self.get_settings_version()
         
-        threshold = datetime.now(timezone.utc) - timedelta(hours=threshold_hours)
-        return last_recon > threshold
+        return HealthRunContext(
+            cutoffs=ThresholdTimestamps.from_thresholds(thresholds),
+            compliance_group=compliance_group,
+            monitored_groups=frozenset(monitored_groups),
+            settings_version=settings_version
+        )
+    
+    async def _resolve_context(self, ctx: Optional[HealthRunContext]) -> HealthRunContext:
+        """
+        Return the given run context, or build one for a single check.
+        """
+        if ctx is None:
+            ctx = await self._build_context()
+        return ctx
+    
+    def _is_after(self, value: Optional[datetime], cutoff: datetime) -> bool:
+        """
+        Check if a device timestamp, such as last contact or last recon,
+        falls after the cut-off.
+        """
+        return value is not None and value > cutoff
     
     def _check_pending_commands(
         self,
         pending_commands: list[dict],
-        threshold_hours: int
+        pending_before: datetime
     ) -> bool:
         """
-        Check if there are pending commands older than threshold.
+        Check if there are pending commands issued before the cut-off.
         """
-        if not pending_commands:
-            return False
-        
-        threshold = datetime.now(timezone.utc) - timedelta(hours=threshold_hours)
-        
         for cmd in pending_commands:
             cmd_date = self._parse_jamf_date(cmd.get("dateIssued"))
-            if cmd_date and cmd_date < threshold:
+            if cmd_date and cmd_date < pending_before:
                 return True
         
         return False
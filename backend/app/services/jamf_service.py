@@ -1,16 +1,64 @@
 import httpx
 import logging
+import time
+import orjson
 from typing import Optional
-from datetime import datetime, timedelta, timezone
 from app.core.config import get_settings
 from app.models.device import JamfToken
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
 import asyncio
-from functools import lru_cache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+_PENDING_STATUSES = frozenset(("Pending", "InProgress"))
+
+# How long before expiry a Jamf token is refreshed
+_TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+def _parse_json(response: httpx.Response):
+    """
+    Decode a Jamf response body with orjson rather than the stdlib parser.
+    """
+    return orjson.loads(response.content)
+
+
+def _json_or_raise(
+    response: httpx.Response,
+    detail: str,
+    not_found_detail: Optional[str] = None
+):
+    """
+    Decode a successful Jamf response, or raise an HTTPException for it.
+    A 404 maps to 404 when not_found_detail is given; any other failure
+    maps to 502.
+    """
+    if response.status_code == 200:
+        return _parse_json(response)
+    
+    path = response.request.url.path
+    if response.status_code == 404 and not_found_detail:
+        logger.warning(f"Jamf resource not found: {path}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found_detail
+        )
+    
+    logger.error(f"Jamf request to {path} failed: {response.status_code}")
+    raise HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=detail
+    )
+
+
+class JamfAuthenticationError(HTTPException):
+    """
+    Raised when no Jamf token can be obtained or Jamf keeps rejecting it.
+    Every other Jamf request will fail the same way, so batch callers stop
+    at the first one.
+    """
+
 
 class JamfAPIService:
     """
@@ -23,83 +71,124 @@ class JamfAPIService:
         self.client_id = settings.jamf_client_id
         self.client_secret = settings.jamf_client_secret
         self._token: Optional[str] = None
-        self._token_expiry: Optional[datetime] = None
+        self._token_refresh_at: Optional[float] = None
+        self._auth_header: Optional[str] = None
         self._lock = asyncio.Lock()
+        # One pooled client for the life of the service, so connections and
+        # TLS sessions are reused and HTTP/2 can multiplex concurrent calls.
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=settings.jamf_pool_size,
+                max_keepalive_connections=settings.jamf_max_keepalive_connections,
+                keepalive_expiry=settings.jamf_keepalive_expiry_seconds
+            )
+        )
+    
+    async def aclose(self) -> None:
+        """
+        Close the underlying HTTP client and its pooled connections.
+        """
+        await self._client.aclose()
     
     async def _get_token(self) -> str:
         """
         Get or refresh OAuth token for Jamf Pro API.
-        Thread-safe with automatic token refresh.
+        A valid token is returned without taking the lock; only a refresh
+        is serialised, and waiters reuse the token it obtained.
         """
+        token = self._token_if_valid()
+        if token:
+            return token
+        
         async with self._lock:
-            if self._token and self._token_expiry:
-                if datetime.now(timezone.utc) < self._token_expiry - timedelta(minutes=5):
-                    return self._token
+            token = self._token_if_valid()
+            if token:
+                return token
             
             logger.info("Requesting new Jamf Pro API token")
             
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{self.base_url}/api/oauth/token",
-                        data={
-                            "client_id": self.client_id,
-                            "client_secret": self.client_secret,
-                            "grant_type": "client_credentials"
-                        },
-                        headers={"Content-Type": "application/x-www-form-urlencoded"}
-                    )
-                    
-                    if response.status_code != 200:
-                        logger.error(f"Failed to authenticate with Jamf Pro: {response.status_code}")
-                        raise HTTPException(
-                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                            detail="Failed to authenticate with Jamf Pro"
-                        )
-                    
-                    token_data = response.json()
-                    self._token = token_data["access_token"]
-                    self._token_expiry = datetime.now(timezone.utc) + timedelta(
-                        seconds=token_data["expires_in"]
+                response = await self._client.post(
+                    "/api/oauth/token",
+                    data={
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret,
+                        "grant_type": "client_credentials"
+                    },
+                    headers={"Content-Type": "application/x-www-form-urlencoded"}
+                )
+                
+                if response.status_code != 200:
+                    logger.error(f"Failed to authenticate with Jamf Pro: {response.status_code}")
+                    raise JamfAuthenticationError(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Failed to authenticate with Jamf Pro"
                     )
-                    
-                    logger.info("Successfully obtained Jamf Pro API token")
-                    return self._token
-                    
+                
+                token_data = _parse_json(response)
+                self._token = token_data["access_token"]
+                self._auth_header = f"Bearer {self._token}"
+                # Stored as a monotonic deadline so the hot path is a single
+                # float comparison unaffected by wall-clock changes
+                self._token_refresh_at = (
+                    time.monotonic() + token_data["expires_in"] - _TOKEN_REFRESH_MARGIN_SECONDS
+                )
+                
+                logger.info("Successfully obtained Jamf Pro API token")
+                return self._token
+                
             except httpx.RequestError as e:
                 logger.error(f"Network error connecting to Jamf Pro: {e}")
-                raise HTTPException(
+                raise JamfAuthenticationError(
                     status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                     detail="Unable to connect to Jamf Pro"
                 )
     
+    def _token_if_valid(self) -> Optional[str]:
+        """
+        Return the current token if it is not due for refresh.
+        """
+        if self._token and self._token_refresh_at and time.monotonic() < self._token_refresh_at:
+            return self._token
+        return None
+    
     async def _make_request(self, method: str, endpoint: str, **kwargs):
         """
         Make authenticated request to Jamf Pro API with error handling.
+        A 401 drops the token and retries once with a fresh one; a second
+        401 raises JamfAuthenticationError.
         """
-        token = await self._get_token()
         headers = kwargs.get("headers", {})
-        headers["Authorization"] = f"Bearer {token}"
         kwargs["headers"] = headers
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await getattr(client, method.lower())(
-                    f"{self.base_url}{endpoint}",
-                    **kwargs
-                )
-                
-                if response.status_code == 401:
-                    logger.warning("Jamf API token expired, refreshing")
-                    self._token = None
-                    self._token_expiry = None
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Jamf authentication failed"
-                    )
+            for attempt in range(2):
+                # The header is built once per token, when it is fetched
+                await self._get_token()
+                auth_header = self._auth_header
+                headers["Authorization"] = auth_header
+                response = await self._client.request(method, endpoint, **kwargs)
                 
-                return response
+                if response.status_code != 401:
+                    return response
                 
+                logger.warning("Jamf API token rejected, refreshing")
+                # Leave a token another request has already refreshed alone
+                if self._auth_header == auth_header:
+                    self._token = None
+                    self._token_refresh_at = None
+                    self._auth_header = None
+            
+            # A 502, not a 401, so clients don't mistake it for their own
+            # session expiring
+            raise JamfAuthenticationError(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Jamf authentication failed"
+            )
+            
         except httpx.TimeoutException:
             logger.error(f"Timeout calling Jamf API: {endpoint}")
             raise HTTPException(
@@ -113,25 +202,58 @@ class JamfAPIService:
                 detail="Error communicating with Jamf Pro"
             )
     
-    async def get_all_computers(self) -> list[dict]:
+    async def get_all_computers_inventory(
+        self,
+        sections: list[str],
+        page_size: int = 200
+    ) -> list[dict]:
         """
-        Retrieve all computers from Jamf Pro inventory.
+        Retrieve inventory for every computer, limited to the given sections.
+        The first page reports the total count, then the remaining pages are
+        fetched concurrently, at most max_jamf_concurrency at a time.
         """
-        logger.debug("Fetching all computers from Jamf Pro")
-        response = await self._make_request("GET", "/api/v1/computers-inventory")
+        logger.debug(f"Fetching computer inventory sections {sections} from Jamf Pro")
+        first_page = await self._get_inventory_page(0, sections, page_size)
+        computers = first_page.get("results", [])
         
-        if response.status_code != 200:
-            logger.error(f"Failed to retrieve computers: {response.status_code}")
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Failed to retrieve computers from Jamf Pro"
-            )
+        total_count = first_page.get("totalCount", len(computers))
+        page_count = -(-total_count // page_size)
+        if page_count > 1:
+            semaphore = asyncio.Semaphore(settings.max_jamf_concurrency)
+            
+            async def fetch(page: int) -> dict:
+                async with semaphore:
+                    return await self._get_inventory_page(page, sections, page_size)
+            
+            pages = await asyncio.gather(*(fetch(page) for page in range(1, page_count)))
+            for page_data in pages:
+                computers.extend(page_data.get("results", []))
         
-        data = response.json()
-        computers = data.get("results", [])
-        logger.info(f"Retrieved {len(computers)} computers from Jamf Pro")
+        logger.info(f"Retrieved inventory for {len(computers)} computers from Jamf Pro")
         return computers
     
+    async def _get_inventory_page(
+        self,
+        page: int,
+        sections: list[str],
+        page_size: int
+    ) -> dict:
+        """
+        Retrieve one page of computer inventory.
+        """
+        response = await self._make_request(
+            "GET",
+            "/api/v1/computers-inventory",
+            params={
+                "section": sections,
+                "page": page,
+                "page-size": page_size,
+                "sort": "id:asc"
+            }
+        )
+        
+        return _json_or_raise(response, "Failed to retrieve computers from Jamf Pro")
+    
     async def get_computer_detail(self, computer_id: int) -> dict:
         """
         Get detailed information for a specific computer.
@@ -142,20 +264,11 @@ class JamfAPIService:
             f"/api/v1/computers-inventory-detail/{computer_id}"
         )
         
-        if response.status_code == 404:
-            logger.warning(f"Computer with ID {computer_id} not found")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Computer with ID {computer_id} not found"
-            )
-        elif response.status_code != 200:
-            logger.error(f"Failed to retrieve computer {computer_id}: {response.status_code}")
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Failed to retrieve computer details"
-            )
-        
-        return response.json()
+        return _json_or_raise(
+            response,
+            "Failed to retrieve computer details",
+            not_found_detail=f"Computer with ID {computer_id} not found"
+        )
     
     async def get_computer_management(self, computer_id: int) -> dict:
         """
@@ -171,22 +284,17 @@ class JamfAPIService:
             logger.warning(f"No management data for computer {computer_id}")
             return {}
         
-        return response.json()
+        return _parse_json(response)
     
-    async def get_failed_policies(self, computer_id: int) -> list[dict]:
+    async def has_failed_policies(self, computer_id: int) -> bool:
         """
-        Get failed policies for a specific computer.
+        Check whether a computer has any failed policy, stopping at the first.
         """
         management_data = await self.get_computer_management(computer_id)
-        failed_policies = []
-        
-        if "policies" in management_data:
-            for policy in management_data.get("policies", []):
-                if policy.get("failed", False):
-                    failed_policies.append(policy)
-        
-        logger.debug(f"Computer {computer_id} has {len(failed_policies)} failed policies")
-        return failed_policies
+        return any(
+            policy.get("failed", False)
+            for policy in management_data.get("policies", [])
+        )
     
     async def get_mdm_commands(self, computer_id: int) -> dict:
         """
@@ -203,33 +311,19 @@ class JamfAPIService:
             logger.warning(f"No MDM commands for computer {computer_id}")
             return {"failed": [], "pending": []}
         
-        commands = response.json().get("results", [])
+        commands = _parse_json(response).get("results", [])
         
-        failed = [cmd for cmd in commands if cmd.get("status") == "Failed"]
-        pending = [
-            cmd for cmd in commands 
-            if cmd.get("status") in ["Pending", "InProgress"]
-        ]
+        failed, pending = [], []
+        for cmd in commands:
+            cmd_status = cmd.get("status")
+            if cmd_status == "Failed":
+                failed.append(cmd)
+            elif cmd_status in _PENDING_STATUSES:
+                pending.append(cmd)
         
         logger.debug(f"Computer {computer_id}: {len(failed)} failed, {len(pending)} pending MDM commands")
         return {"failed": failed, "pending": pending}
     
-    async def get_smart_groups(self) -> list[dict]:
-        """
-        Get all smart computer groups.
-        """
-        logger.debug("Fetching smart groups from Jamf Pro")
-        response = await self._make_request("GET", "/JSSResource/computergroups")
-        
-        if response.status_code != 200:
-            logger.warning("Failed to retrieve smart groups")
-            return []
-        
-        groups = response.json().get("computer_groups", [])
-        smart_groups = [g for g in groups if g.get("is_smart", False)]
-        logger.info(f"Retrieved {len(smart_groups)} smart groups")
-        return smart_groups
-    
     async def get_computer_group_membership(self, computer_id: int) -> list[str]:
         """
         Get group memberships for a specific computer.
@@ -244,7 +338,7 @@ class JamfAPIService:
             logger.warning(f"Failed to retrieve group memberships for computer {computer_id}")
             return []
         
-        computer = response.json().get("computer", {})
+        computer = _parse_json(response).get("computer", {})
         groups = computer.get("groups_accounts", {}).get("computer_group_memberships", [])
         
         group_names = [g.get("name") for g in groups if g.get("name")]
@@ -252,9 +346,9 @@ class JamfAPIService:
         return group_names
 
 
-@lru_cache()
-def get_jamf_service() -> JamfAPIService:
+def get_jamf_service(request: Request) -> JamfAPIService:
     """
     Dependency injection for JamfAPIService.
+    Returns the instance created in the application lifespan.
     """
-    return JamfAPIService()
+    return request.app.state.jamf
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class SegmentedLRUCache:
+    """
+    Scan-resistant LRU cache with per-entry expiry.
+    New entries start in a probation segment and move to a protected
+    segment only when read again, so a single pass over many keys evicts
+    other one-off entries rather than the frequently read ones.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttu: Callable[[Hashable, Any, float], float],
+        protected_ratio: float = 0.8
+    ):
+        self.maxsize = maxsize
+        self.protected_maxsize = max(1, int(maxsize * protected_ratio))
+        self._ttu = ttu
+        self._probation: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._protected: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._probation) + len(self._protected)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.peek(key) is not None
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        entry = (value, self._ttu(key, value, now))
+
+        if key in self._protected:
+            self._protected[key] = entry
+            self._protected.move_to_end(key)
+            return
+
+        self._probation[key] = entry
+        self._probation.move_to_end(key)
+
+        while len(self) > self.maxsize:
+            if self._probation:
+                self._probation.popitem(last=False)
+            else:
+                self._protected.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return a live entry, promoting it to the protected segment.
+        """
+        now = time.monotonic()
+
+        entry = self._protected.get(key)
+        if entry is not None:
+            if entry[1] <= now:
+                del self._protected[key]
+                return default
+            self._protected.move_to_end(key)
+            return entry[0]
+
+        entry = self._probation.pop(key, None)
+        if entry is None:
+            return default
+        if entry[1] <= now:
+            return default
+
+        self._protected[key] = entry
+        if len(self._protected) > self.protected_maxsize:
+            demoted_key, demoted_entry = self._protected.popitem(last=False)
+            self._probation[demoted_key] = demoted_entry
+        return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return a live entry without changing its position.
+        """
+        entry = self._protected.get(key) or self._probation.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return default
+        return entry[0]
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        entry = self._protected.pop(key, None) or self._probation.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self) -> None:
+        self._probation.clear()
+        self._protected.clear()